@@ -4,16 +4,23 @@ from __future__ import annotations
 
 import argparse
 import os
-from typing import Dict, List
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, List
 
 from anthropic import Anthropic
-from anthropic.types.beta import (
-    BetaContentBlockParam,
-    BetaMemoryTool20250818Command,
-    BetaMessageParam,
-)
+from anthropic.types.beta import BetaMemoryTool20250818Command
 from pydantic import TypeAdapter
 
+if TYPE_CHECKING:
+    from anthropic.types.beta import (
+        BetaContentBlockParam,
+        BetaMemoryTool20250818Param,
+        BetaMessageParam,
+        BetaToolChoiceParam,
+        BetaToolUnionParam,
+        BetaToolUseBlock,
+    )
+
 try:
     from memorylake import MemoryTool, MemoryToolError
 except ModuleNotFoundError:  # pragma: no cover - fallback when not installed
@@ -26,12 +33,15 @@ except ModuleNotFoundError:  # pragma: no cover - fallback when not installed
 # Claude memory tool requires the context management beta header (2025-06-27).
 _BETA_FEATURES = ["context-management-2025-06-27"]
 _COMMAND_ADAPTER = TypeAdapter(BetaMemoryTool20250818Command)
-
-os.environ["ANTHROPIC_API_KEY"] = "ANTHROPIC_API_KEY"
-
-os.environ["ANTHROPIC_MODEL"] = "claude-sonnet-4-5-20250929"
-
-os.environ["ANTHROPIC_BASE_URL"] = "ANTHROPIC_BASE_URL"
+# Built once so the tool definition is byte-identical on every request; the cache_control
+# marker lets the API serve this static prefix from its prompt cache after the first turn.
+_MEMORY_TOOL: BetaMemoryTool20250818Param = {
+    "type": "memory_20250818",
+    "name": "memory",
+    "cache_control": {"type": "ephemeral"},
+}
+_TOOLS: List[BetaToolUnionParam] = [_MEMORY_TOOL]
+_TOOL_CHOICE: BetaToolChoiceParam = {"type": "auto"}
 
 
 def run_chat(
@@ -41,7 +51,8 @@ def run_chat(
     memory_path: str,
 ) -> None:
     client = Anthropic(api_key=api_key, base_url=base_url)
-    memory_tool = MemoryTool(base_path=memory_path)
+    abs_memory_path = os.path.abspath(memory_path)
+    memory_tool = MemoryTool(base_path=abs_memory_path)
 
     messages: List[BetaMessageParam] = []
     local_menu: Dict[str, str] = {
@@ -54,6 +65,7 @@ def run_chat(
         "memory-rename": "Rename path",
         "memory-exists": "Check existence",
         "memory-list": "List directory",
+        "memory-search": "Search memories by keywords (quote for a phrase)",
         "memory-clear": "Clear all memories",
         "memory-stats": "View stats",
         "memory-exec": "Execute raw tool command",
@@ -61,7 +73,7 @@ def run_chat(
 
     print(
         f"🧠 Claude + MemoryTool demo (model: {model}) · type '/exit' to quit "
-        f"· memory directory: {os.path.abspath(memory_path)}/memories"
+        f"· memory directory: {abs_memory_path}/memories"
     )
     print("Local commands: /help")
 
@@ -79,41 +91,64 @@ def run_chat(
 
         messages.append({"role": "user", "content": user_input})
 
-        needs_follow_up = True
-        while needs_follow_up:
-            needs_follow_up = False
-
-            response = client.beta.messages.create(
+        while True:
+            # Stream the reply so text is printed as it arrives instead of after the full message.
+            with client.beta.messages.stream(
                 model=model,
                 max_tokens=1024,
                 messages=messages,
-                tools=[{"type": "memory_20250818", "name": "memory"}],
+                tools=_TOOLS,
                 betas=_BETA_FEATURES,
-                tool_choice={"type": "auto"},
-            )
+                tool_choice=_TOOL_CHOICE,
+            ) as stream:
+                printed_header = False
+                for text in stream.text_stream:
+                    if not printed_header:
+                        print("\nClaude:", end=" ", flush=True)
+                        printed_header = True
+                    print(text, end="", flush=True)
+                response = stream.get_final_message()
+            if printed_header:
+                print()
 
             messages.append({"role": "assistant", "content": response.content})
 
-            printed_header = False
-            for block in response.content:
-                if block.type == "text":
-                    if not printed_header:
-                        print("\nClaude:", end=" ")
-                        printed_header = True
-                    print(block.text)
-                elif block.type == "tool_use" and block.name == "memory":
-                    command = _COMMAND_ADAPTER.validate_python(block.input)
-                    result_text = memory_tool.execute(command)
-
-                    tool_result_block: BetaContentBlockParam = {
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": result_text,
-                    }
-                    messages.append({"role": "user", "content": [tool_result_block]})
-                    needs_follow_up = True
-                    printed_header = False
-                    break
+            tool_uses: List[BetaToolUseBlock] = [
+                block
+                for block in response.content
+                if block.type == "tool_use" and block.name == "memory"
+            ]
+            if not tool_uses:
+                break
+
+            # Every tool_use block must be answered in the next user message, so a failed command
+            # becomes an error result for its block instead of aborting the whole turn.
+            commands = [_COMMAND_ADAPTER.validate_python(block.input) for block in tool_uses]
+            results = memory_tool.execute_commands(commands, return_exceptions=True)
+            tool_result_blocks: List[BetaContentBlockParam] = [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": f"Error: {result}",
+                    "is_error": True,
+                }
+                if isinstance(result, MemoryToolError)
+                else {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": result,
+                }
+                for block, result in zip(tool_uses, results)
+            ]
+            messages.append({"role": "user", "content": tool_result_blocks})
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    """Outcome of a local ``/`` command; the interactive loop prints ``text``."""
+
+    text: str
+    ok: bool = True
 
 
 def _handle_local_command(
@@ -121,10 +156,18 @@ def _handle_local_command(
     memory_tool: MemoryTool,
     menu: Dict[str, str],
 ) -> bool:
+    print(_execute_local_command(raw, memory_tool, menu).text)
+    return True
+
+
+def _execute_local_command(
+    raw: str,
+    memory_tool: MemoryTool,
+    menu: Dict[str, str],
+) -> CommandResult:
     command_line = raw[1:].strip()
     if not command_line:
-        _print_menu(menu)
-        return True
+        return CommandResult(_format_menu(menu))
 
     parts = command_line.split()
     name = parts[0]
@@ -132,126 +175,184 @@ def _handle_local_command(
 
     try:
         if name == "help":
-            _print_menu(menu)
-        elif name == "memory-view":
-            path = args[0] if args else _prompt("Path")
-            view_range = None
-            if len(args) >= 3:
-                view_range = (int(args[1]), int(args[2]))
-            else:
-                range_input = _prompt("Line range (e.g. 1 10, optional)")
-                if range_input:
-                    tokens = range_input.replace(",", " ").split()
-                    if len(tokens) == 2:
-                        view_range = (int(tokens[0]), int(tokens[1]))
-            print(memory_tool.view_path(path, view_range))
-        elif name == "memory-create":
-            path = args[0] if args else _prompt("Path")
-            text = " ".join(args[1:]) if len(args) > 1 else _prompt("Content")
-            memory_tool.create_file(path, text)
-            print("Created")
-        elif name == "memory-insert":
-            path = args[0] if args else _prompt("Path")
-            line_index = int(args[1]) if len(args) > 1 else int(_prompt("Line number"))
-            text = " ".join(args[2:]) if len(args) > 2 else _prompt("Text")
-            memory_tool.insert_line(path, line_index, text)
-            print("Inserted")
-        elif name == "memory-replace":
-            path = args[0] if args else _prompt("Path")
-            old = args[1] if len(args) > 1 else _prompt("Old text")
-            new = args[2] if len(args) > 2 else _prompt("New text")
-            memory_tool.replace_text(path, old, new)
-            print("Replaced")
-        elif name == "memory-delete":
-            path = args[0] if args else _prompt("Path")
-            memory_tool.delete_path(path)
-            print("Deleted")
-        elif name == "memory-rename":
-            old = args[0] if args else _prompt("Old path")
-            new = args[1] if len(args) > 1 else _prompt("New path")
-            memory_tool.rename_path(old, new)
-            print("Renamed")
-        elif name == "memory-exists":
-            path = args[0] if args else _prompt("Path")
-            exists = memory_tool.memory_exists(path)
-            print("Exists" if exists else "Does not exist")
-        elif name == "memory-list":
-            path = args[0] if args else "/memories"
-            entries = memory_tool.list_memories(path)
-            if not entries:
-                print("(empty)")
-            else:
-                for item in entries:
-                    print(item)
-        elif name == "memory-clear":
-            memory_tool.clear_all()
-            print("Cleared")
-        elif name == "memory-stats":
-            for key, value in memory_tool.stats().items():
-                print(f"{key}: {value}")
-        elif name == "memory-exec":
-            _run_exec_command(memory_tool, args)
-        else:
-            print("Unknown command")
+            return CommandResult(_format_menu(menu))
+        handler = _LOCAL_COMMANDS.get(name)
+        if handler is None:
+            return CommandResult("Unknown command", ok=False)
+        return handler(memory_tool, args)
     except MemoryToolError as exc:
-        print(f"Error: {exc}")
+        return CommandResult(f"Error: {exc}", ok=False)
     except ValueError as exc:
-        print(f"Invalid input: {exc}")
+        return CommandResult(f"Invalid input: {exc}", ok=False)
     except Exception as exc:  # pragma: no cover - safety net
-        print(f"Error: {exc}")
-    return True
+        return CommandResult(f"Error: {exc}", ok=False)
 
 
-def _run_exec_command(memory_tool: MemoryTool, args: List[str]) -> None:
-    command = args[0] if args else _prompt("command (view/create/insert/str_replace/delete/rename)")
-    extra = args[1:]
-    payload: Dict[str, object] = {"command": command}
-
-    if command == "view":
-        path = extra[0] if extra else _prompt("Path")
-        payload["path"] = path
-        if len(extra) >= 3:
-            payload["view_range"] = [int(extra[1]), int(extra[2])]
-        else:
-            range_input = _prompt("Line range (e.g. 1 10, optional)")
-            if range_input:
-                tokens = range_input.replace(",", " ").split()
-                if len(tokens) == 2:
-                    payload["view_range"] = [int(tokens[0]), int(tokens[1])]
-    elif command == "create":
-        path = extra[0] if extra else _prompt("Path")
-        text = " ".join(extra[1:]) if len(extra) > 1 else _prompt("Content")
-        payload.update({"path": path, "file_text": text})
-    elif command == "insert":
-        path = extra[0] if extra else _prompt("Path")
-        index = int(extra[1]) if len(extra) > 1 else int(_prompt("Line number"))
-        text = " ".join(extra[2:]) if len(extra) > 2 else _prompt("Text")
-        payload.update({"path": path, "insert_line": index, "insert_text": text})
-    elif command == "str_replace":
-        path = extra[0] if extra else _prompt("Path")
-        old = extra[1] if len(extra) > 1 else _prompt("Old text")
-        new = extra[2] if len(extra) > 2 else _prompt("New text")
-        payload.update({"path": path, "old_str": old, "new_str": new})
-    elif command == "delete":
-        path = extra[0] if extra else _prompt("Path")
-        payload["path"] = path
-    elif command == "rename":
-        old = extra[0] if extra else _prompt("Old path")
-        new = extra[1] if len(extra) > 1 else _prompt("New path")
-        payload.update({"old_path": old, "new_path": new})
+def _local_view(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else _prompt("Path")
+    view_range = None
+    if len(args) >= 3:
+        view_range = (int(args[1]), int(args[2]))
     else:
-        print("Unsupported tool command")
-        return
+        range_input = _prompt("Line range (e.g. 1 10, optional)")
+        if range_input:
+            tokens = range_input.replace(",", " ").split()
+            if len(tokens) == 2:
+                view_range = (int(tokens[0]), int(tokens[1]))
+    return CommandResult(memory_tool.view_path(path, view_range))
+
+
+def _local_create(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else _prompt("Path")
+    text = " ".join(args[1:]) if len(args) > 1 else _prompt("Content")
+    memory_tool.create_file(path, text)
+    return CommandResult("Created")
+
 
-    result = memory_tool.execute_tool_payload(payload)
-    print(result)
+def _local_insert(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else _prompt("Path")
+    line_index = int(args[1]) if len(args) > 1 else int(_prompt("Line number"))
+    text = " ".join(args[2:]) if len(args) > 2 else _prompt("Text")
+    memory_tool.insert_line(path, line_index, text)
+    return CommandResult("Inserted")
 
 
-def _print_menu(menu: Dict[str, str]) -> None:
-    print("Local commands:")
-    for key, desc in menu.items():
-        print(f"/{key} - {desc}")
-    print("/exit - exit")
+def _local_replace(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else _prompt("Path")
+    old = args[1] if len(args) > 1 else _prompt("Old text")
+    new = args[2] if len(args) > 2 else _prompt("New text")
+    memory_tool.replace_text(path, old, new)
+    return CommandResult("Replaced")
+
+
+def _local_delete(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else _prompt("Path")
+    memory_tool.delete_path(path)
+    return CommandResult("Deleted")
+
+
+def _local_rename(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    old = args[0] if args else _prompt("Old path")
+    new = args[1] if len(args) > 1 else _prompt("New path")
+    memory_tool.rename_path(old, new)
+    return CommandResult("Renamed")
+
+
+def _local_exists(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else _prompt("Path")
+    exists = memory_tool.memory_exists(path)
+    return CommandResult("Exists" if exists else "Does not exist")
+
+
+def _local_list(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    path = args[0] if args else "/memories"
+    entries = memory_tool.list_memories(path)
+    return CommandResult("\n".join(entries) if entries else "(empty)")
+
+
+def _local_search(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    query = " ".join(args) if args else _prompt("Query")
+    # A double-quoted query is searched as an exact phrase.
+    phrase = len(query) > 1 and query[0] == query[-1] == '"'
+    matches = memory_tool.search_memory(query, phrase=phrase)
+    if not matches:
+        return CommandResult("(no matches)")
+    return CommandResult("\n".join(f"{path}: lines {', '.join(map(str, lines))}" for path, lines in matches.items()))
+
+
+def _local_clear(memory_tool: MemoryTool, _args: List[str]) -> CommandResult:
+    memory_tool.clear_all()
+    return CommandResult("Cleared")
+
+
+def _local_stats(memory_tool: MemoryTool, _args: List[str]) -> CommandResult:
+    return CommandResult("\n".join(f"{key}: {value}" for key, value in memory_tool.stats().items()))
+
+
+def _run_exec_command(memory_tool: MemoryTool, args: List[str]) -> CommandResult:
+    command = args[0] if args else _prompt("command (view/create/insert/str_replace/delete/rename)")
+    build_payload = _EXEC_PAYLOAD_BUILDERS.get(command)
+    if build_payload is None:
+        return CommandResult("Unsupported tool command", ok=False)
+
+    payload: Dict[str, object] = {"command": command}
+    payload.update(build_payload(args[1:]))
+    return CommandResult(memory_tool.execute_tool_payload(payload))
+
+
+def _exec_view_payload(extra: List[str]) -> Dict[str, object]:
+    payload: Dict[str, object] = {"path": extra[0] if extra else _prompt("Path")}
+    if len(extra) >= 3:
+        payload["view_range"] = [int(extra[1]), int(extra[2])]
+    else:
+        range_input = _prompt("Line range (e.g. 1 10, optional)")
+        if range_input:
+            tokens = range_input.replace(",", " ").split()
+            if len(tokens) == 2:
+                payload["view_range"] = [int(tokens[0]), int(tokens[1])]
+    return payload
+
+
+def _exec_create_payload(extra: List[str]) -> Dict[str, object]:
+    path = extra[0] if extra else _prompt("Path")
+    text = " ".join(extra[1:]) if len(extra) > 1 else _prompt("Content")
+    return {"path": path, "file_text": text}
+
+
+def _exec_insert_payload(extra: List[str]) -> Dict[str, object]:
+    path = extra[0] if extra else _prompt("Path")
+    index = int(extra[1]) if len(extra) > 1 else int(_prompt("Line number"))
+    text = " ".join(extra[2:]) if len(extra) > 2 else _prompt("Text")
+    return {"path": path, "insert_line": index, "insert_text": text}
+
+
+def _exec_str_replace_payload(extra: List[str]) -> Dict[str, object]:
+    path = extra[0] if extra else _prompt("Path")
+    old = extra[1] if len(extra) > 1 else _prompt("Old text")
+    new = extra[2] if len(extra) > 2 else _prompt("New text")
+    return {"path": path, "old_str": old, "new_str": new}
+
+
+def _exec_delete_payload(extra: List[str]) -> Dict[str, object]:
+    return {"path": extra[0] if extra else _prompt("Path")}
+
+
+def _exec_rename_payload(extra: List[str]) -> Dict[str, object]:
+    old = extra[0] if extra else _prompt("Old path")
+    new = extra[1] if len(extra) > 1 else _prompt("New path")
+    return {"old_path": old, "new_path": new}
+
+
+# Command name -> handler tables, so dispatch is one dict lookup instead of an if/elif chain.
+_LOCAL_COMMANDS: Dict[str, Callable[[MemoryTool, List[str]], CommandResult]] = {
+    "memory-view": _local_view,
+    "memory-create": _local_create,
+    "memory-insert": _local_insert,
+    "memory-replace": _local_replace,
+    "memory-delete": _local_delete,
+    "memory-rename": _local_rename,
+    "memory-exists": _local_exists,
+    "memory-list": _local_list,
+    "memory-search": _local_search,
+    "memory-clear": _local_clear,
+    "memory-stats": _local_stats,
+    "memory-exec": _run_exec_command,
+}
+_EXEC_PAYLOAD_BUILDERS: Dict[str, Callable[[List[str]], Dict[str, object]]] = {
+    "view": _exec_view_payload,
+    "create": _exec_create_payload,
+    "insert": _exec_insert_payload,
+    "str_replace": _exec_str_replace_payload,
+    "delete": _exec_delete_payload,
+    "rename": _exec_rename_payload,
+}
+
+
+def _format_menu(menu: Dict[str, str]) -> str:
+    lines = ["Local commands:"]
+    lines.extend(f"/{key} - {desc}" for key, desc in menu.items())
+    lines.append("/exit - exit")
+    return "\n".join(lines)
 
 
 def _prompt(label: str) -> str:
@@ -1,12 +1,48 @@
 """Public interface for the MemoryLake client package."""
 
+from typing import TYPE_CHECKING, Any
+
 __version__: str = "0.1.0"
 
-__all__ = ["MemoryTool", "MemoryToolError", "MemoryToolOperationError", "MemoryToolPathError", "__version__"]
+__all__ = [
+    "DeleteLine",
+    "Edit",
+    "InsertLine",
+    "MemoryTool",
+    "MemoryToolError",
+    "MemoryToolOperationError",
+    "MemoryToolPathError",
+    "ReplaceText",
+    "__version__",
+]
+
+if TYPE_CHECKING:
+    from .memorytool import (
+        DeleteLine,
+        Edit,
+        InsertLine,
+        MemoryTool,
+        MemoryToolError,
+        MemoryToolOperationError,
+        MemoryToolPathError,
+        ReplaceText,
+    )
+
+# ``memorytool`` pulls in the anthropic SDK, so it is only imported once one of its names is used.
+_LAZY_EXPORTS = frozenset(__all__) - {"__version__"}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from . import memorytool
+
+    namespace = globals()
+    for export in _LAZY_EXPORTS:
+        namespace[export] = getattr(memorytool, export)
+    return namespace[name]
+
 
-from .memorytool import (
-    MemoryTool,
-    MemoryToolError,
-    MemoryToolOperationError,
-    MemoryToolPathError,
-)
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | _LAZY_EXPORTS)
@@ -0,0 +1,110 @@
+"""
+Inverted index over memory files, used by :meth:`memorylake.MemoryTool.search_memory`.
+
+The index maps each lower-cased word token to the lines it occurs on, per memory path, so
+a keyword query is a handful of dict lookups instead of a scan over every memory file.
+Word pairs and triples that are adjacent on a line are indexed under space-joined keys in
+the same table, so phrase queries are served from the index as well.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Final
+
+__all__ = ["MAX_NGRAM", "InvertedIndex", "tokenize"]
+
+
+_TOKEN_PATTERN: Final[re.Pattern[str]] = re.compile(r"\w+")
+# Longest run of adjacent tokens indexed under a single key.
+MAX_NGRAM: Final[int] = 3
+
+
+def tokenize(text: str) -> list[str]:
+    """Split ``text`` into lower-cased word tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    """Map word tokens (and adjacent pairs and triples) to their 1-based line numbers, per memory path."""
+
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[str, list[int]]] = {}
+        # Keys indexed for each path, so a path can be dropped without scanning every posting list.
+        self._keys_by_path: dict[str, list[str]] = {}
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._keys_by_path
+
+    def __len__(self) -> int:
+        return len(self._keys_by_path)
+
+    def update(self, path: str, text: str) -> None:
+        """(Re)index ``path`` with ``text`` as its full content."""
+        self.remove(path)
+        lines_by_key: dict[str, list[int]] = {}
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            tokens = tokenize(line)
+            keys = list(tokens)
+            for size in range(2, MAX_NGRAM + 1):
+                keys.extend(" ".join(tokens[start:start + size]) for start in range(len(tokens) - size + 1))
+            for key in keys:
+                lines = lines_by_key.setdefault(key, [])
+                if not lines or lines[-1] != line_no:
+                    lines.append(line_no)
+
+        for key, lines in lines_by_key.items():
+            self._postings.setdefault(key, {})[path] = lines
+        self._keys_by_path[path] = list(lines_by_key)
+
+    def remove(self, path: str) -> None:
+        for key in self._keys_by_path.pop(path, ()):
+            postings = self._postings[key]
+            del postings[path]
+            if not postings:
+                del self._postings[key]
+
+    def lookup(self, query: str) -> dict[str, list[int]]:
+        """Return ``{path: line numbers}`` for lines containing every token of ``query``."""
+        return self._intersect(set(tokenize(query)))
+
+    def lookup_phrase(self, query: str) -> dict[str, list[int]]:
+        """Return ``{path: line numbers}`` for lines containing the tokens of ``query`` adjacently.
+
+        Phrases of up to :data:`MAX_NGRAM` tokens are answered exactly. Longer phrases intersect
+        the postings of their overlapping triples, which yields a superset of the exact matches
+        that the caller confirms against the line text.
+        """
+        tokens = tokenize(query)
+        if len(tokens) <= MAX_NGRAM:
+            return self._intersect({" ".join(tokens)} if tokens else set())
+        return self._intersect(
+            {" ".join(tokens[start:start + MAX_NGRAM]) for start in range(len(tokens) - MAX_NGRAM + 1)}
+        )
+
+    def _intersect(self, keys: set[str]) -> dict[str, list[int]]:
+        if not keys:
+            return {}
+
+        posting_lists: list[dict[str, list[int]]] = []
+        for key in keys:
+            postings = self._postings.get(key)
+            if postings is None:
+                return {}
+            posting_lists.append(postings)
+        # Walk the rarest key's postings and probe the others.
+        posting_lists.sort(key=len)
+        rarest, others = posting_lists[0], posting_lists[1:]
+
+        matches: dict[str, list[int]] = {}
+        for path, lines in rarest.items():
+            candidates = set(lines)
+            for postings in others:
+                other_lines = postings.get(path)
+                if other_lines is None:
+                    candidates.clear()
+                    break
+                candidates.intersection_update(other_lines)
+            if candidates:
+                matches[path] = sorted(candidates)
+        return matches
@@ -19,10 +19,19 @@ callers can manage memories without synthesising command payloads themselves.
 
 from __future__ import annotations
 
-import shutil
-from collections.abc import Mapping
+import ctypes
+import errno
+import mmap
+import os
+import re
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from functools import partial
 from pathlib import Path
-from typing import Final
+from typing import TYPE_CHECKING, Any, Final, Literal, Union, overload
 
 from anthropic.lib.tools import BetaAbstractMemoryTool
 from anthropic.types.beta import (
@@ -37,7 +46,118 @@ from anthropic.types.beta import (
 from pydantic import TypeAdapter
 from typing_extensions import override
 
-__all__ = ["MemoryTool", "MemoryToolError", "MemoryToolPathError", "MemoryToolOperationError"]
+from .index import MAX_NGRAM, InvertedIndex, tokenize
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+
+__all__ = [
+    "DeleteLine",
+    "Edit",
+    "InsertLine",
+    "MemoryTool",
+    "MemoryToolError",
+    "MemoryToolPathError",
+    "MemoryToolOperationError",
+    "ReplaceText",
+]
+
+
+_AT_FDCWD: Final[int] = -100
+_RENAME_NOREPLACE: Final[int] = 1
+# Line boundaries ``str.splitlines`` recognises besides "\n". ``view`` numbers lines with ``splitlines``,
+# so the "\n"-only fast paths below are taken only when none of these occur.
+_EXTRA_LINE_BREAKS: Final[str] = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_LINE_BREAKS: Final[str] = "\n" + _EXTRA_LINE_BREAKS
+# The same separators, UTF-8 encoded. "\r\n" is a single break, so only a lone "\r" shifts the "\n" count.
+_EXTRA_LINE_BREAKS_UTF8: Final[tuple[bytes, ...]] = tuple(
+    separator.encode("utf-8") for separator in _EXTRA_LINE_BREAKS if separator != "\r"
+)
+_LONE_CARRIAGE_RETURN: Final[re.Pattern[bytes]] = re.compile(rb"\r(?!\n)")
+
+
+def _load_renameat2() -> Callable[[int, bytes, int, bytes, int], int] | None:
+    """Return libc's ``renameat2`` on Linux, or ``None`` when it is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError):  # pragma: no cover - glibc < 2.28 or non-glibc libc
+        return None
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+
+_RENAMEAT2: Final[Callable[[int, bytes, int, bytes, int], int] | None] = _load_renameat2()
+
+
+def _rename_noreplace(source: Path, destination: Path) -> None:
+    """Rename ``source`` to ``destination``, raising ``FileExistsError`` instead of overwriting.
+
+    On Linux this is a single atomic ``renameat2(RENAME_NOREPLACE)`` call; elsewhere (or on
+    filesystems without support for the flag) it falls back to an existence check plus ``os.rename``.
+    """
+    if _RENAMEAT2 is not None:
+        if _RENAMEAT2(_AT_FDCWD, os.fsencode(source), _AT_FDCWD, os.fsencode(destination), _RENAME_NOREPLACE) == 0:
+            return
+        err = ctypes.get_errno()
+        if err not in (errno.EINVAL, errno.ENOSYS):
+            raise OSError(err, os.strerror(err), str(source), None, str(destination))
+
+    if os.path.lexists(destination):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(destination))
+    os.rename(source, destination)
+
+
+def _translate_newlines(text: str) -> str:
+    r"""Return ``text`` as reading it back from a file in text mode would: "\r\n" and "\r" become "\n"."""
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _remove_tree(root: Path) -> None:
+    """Delete ``root`` and everything below it without following symlinks.
+
+    Unlike ``shutil.rmtree`` this does not ``lstat`` every entry: the file type comes from the
+    ``os.scandir`` directory listing, so each entry costs a single ``unlink``/``rmdir`` call. Like it,
+    a ``root`` that is itself a symlink is refused rather than followed.
+    """
+    if os.path.islink(root):
+        raise OSError(f"refusing to remove a symbolic link: {root}")
+    pending: list[tuple[str, bool]] = [(os.fspath(root), False)]
+    while pending:
+        directory, children_removed = pending.pop()
+        if children_removed:
+            os.rmdir(directory)
+            continue
+        pending.append((directory, True))
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, False))
+                else:
+                    os.unlink(entry.path)
+
+
+def _iter_tree(root: str) -> Iterator[os.DirEntry[str]]:
+    """Yield every entry below ``root``, descending into directories but not into symlinks to them.
+
+    Entries come straight from ``os.scandir``, so their type (and, on Windows, their stat result)
+    is known without an extra ``stat`` call per entry. Directories removed during the walk are skipped.
+    """
+    pending: list[str] = [root]
+    while pending:
+        try:
+            scanner = os.scandir(pending.pop())
+        except FileNotFoundError:
+            continue
+        with scanner as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                yield entry
 
 
 class MemoryToolError(Exception):
@@ -52,11 +172,44 @@ class MemoryToolOperationError(MemoryToolError):
     """Raised when a filesystem operation fails."""
 
 
+@dataclass(frozen=True)
+class InsertLine:
+    """Insert ``text`` as a new line after the first ``line`` lines, like :meth:`MemoryTool.insert_line`."""
+
+    line: int
+    text: str
+
+
+@dataclass(frozen=True)
+class ReplaceText:
+    """Replace the single occurrence of ``old`` with ``new``, like :meth:`MemoryTool.replace_text`."""
+
+    old: str
+    new: str
+
+
+@dataclass(frozen=True)
+class DeleteLine:
+    """Remove line ``line``, numbered from 1 as in ``view`` output."""
+
+    line: int
+
+
+Edit = Union[InsertLine, ReplaceText, DeleteLine]
+
+
 class MemoryTool(BetaAbstractMemoryTool):
     """Filesystem-backed implementation of the Anthropic memory tool contract."""
 
     _MEMORY_ROOT_NAME: Final[str] = "memories"
     _NAMESPACE_PREFIX: Final[str] = "/memories"
+    _NAMESPACE_PREFIX_LEN: Final[int] = len(_NAMESPACE_PREFIX)
+    # Ranged views of files at least this large are served from an mmap instead of a full read.
+    _MMAP_VIEW_THRESHOLD: Final[int] = 1 << 20
+    # Replacements in files at least this large first search the raw bytes via mmap, so a miss never decodes the file.
+    _MMAP_REPLACE_THRESHOLD: Final[int] = 1 << 20
+    _KNOWN_DIRS_MAXSIZE: Final[int] = 1024
+    _EDIT_COMMANDS: Final[frozenset[str]] = frozenset({"create", "str_replace", "insert"})
     _COMMAND_ADAPTER: Final[TypeAdapter[BetaMemoryTool20250818Command]] = TypeAdapter(
         BetaMemoryTool20250818Command
     )
@@ -65,11 +218,39 @@ class MemoryTool(BetaAbstractMemoryTool):
         super().__init__()
         self._base_path: Path = Path(base_path).expanduser().resolve()
         self._memory_root: Path = self._base_path / self._MEMORY_ROOT_NAME
+        self._memory_root_str: str = os.fspath(self._memory_root)
+        self._memory_root_prefix: str = os.path.join(self._memory_root_str, "")
         self._memory_root.mkdir(parents=True, exist_ok=True)
+        # LRU of directories already created by ``_ensure_parent_dir``; values are unused.
+        self._known_dirs: OrderedDict[str, None] = OrderedDict()
+        # Search index, built on first search and refreshed from per-file (mtime_ns, size) signatures.
+        self._index: InvertedIndex = InvertedIndex()
+        self._index_signatures: dict[str, tuple[int, int]] = {}
+        # Resolved once so ``execute`` is a single dict lookup instead of the base class's if/elif chain.
+        self._command_handlers: dict[str, Callable[[Any], str]] = {
+            "view": self.view,
+            "create": self.create,
+            "str_replace": self.str_replace,
+            "insert": self.insert,
+            "delete": self.delete,
+            "rename": self.rename,
+        }
+        # Batched writes (coalesced edit runs, ``create_files``) bypass these handlers, so they fall back
+        # to the per-command path when a subclass overrides any of them.
+        self._edit_handlers_overridden: bool = any(
+            getattr(type(self), name) is not getattr(MemoryTool, name) for name in self._EDIT_COMMANDS
+        )
 
     # ------------------------------------------------------------------ #
     # Tool interface (invoked by Anthropic runtime)
     # ------------------------------------------------------------------ #
+    @override
+    def execute(self, command: BetaMemoryTool20250818Command) -> str:
+        handler = self._command_handlers.get(command.command)
+        if handler is None:
+            raise MemoryToolOperationError(f"unsupported command: {command.command}")
+        return handler(command)
+
     @override
     def view(self, command: BetaMemoryTool20250818ViewCommand) -> str:
         target = self._resolve_path(command.path)
@@ -89,23 +270,21 @@ class MemoryTool(BetaAbstractMemoryTool):
         if not target.is_file():
             raise MemoryToolOperationError(f"path does not exist: {command.path}")
 
-        content = target.read_text(encoding="utf-8").splitlines()
         if command.view_range:
             start_line = max(1, command.view_range[0]) - 1
-            end_line = (
-                len(content)
-                if command.view_range[1] == -1
-                else max(command.view_range[1], start_line + 1)
-            )
-            content = content[start_line:end_line]
+            end_line = None if command.view_range[1] == -1 else max(command.view_range[1], start_line + 1)
+            if target.stat().st_size >= self._MMAP_VIEW_THRESHOLD:
+                content = self._read_line_range(target, start_line, end_line)
+            else:
+                content = self._slice_lines(target.read_bytes(), start_line, end_line)
             base_idx = start_line + 1
         else:
+            content = target.read_text(encoding="utf-8").splitlines()
             base_idx = 1
 
-        numbered = [f"{idx + base_idx:4d}: {line}" for idx, line in enumerate(content)]
         output_lines: list[str] = [f"File: {command.path}"]
-        if numbered:
-            output_lines.extend(numbered)
+        if content:
+            output_lines.extend([f"{idx:4d}: {line}" for idx, line in enumerate(content, base_idx)])
         else:
             output_lines.append("(empty file)")
         return "\n".join(output_lines)
@@ -113,8 +292,7 @@ class MemoryTool(BetaAbstractMemoryTool):
     @override
     def create(self, command: BetaMemoryTool20250818CreateCommand) -> str:
         target = self._resolve_path(command.path)
-        self._ensure_parent_dir(target)
-        target.write_text(command.file_text, encoding="utf-8")
+        self._write_file(target, command.file_text)
         return f"File created: {command.path}"
 
     @override
@@ -123,16 +301,18 @@ class MemoryTool(BetaAbstractMemoryTool):
         if not target.is_file():
             raise MemoryToolOperationError(f"file not found: {command.path}")
 
-        content = target.read_text(encoding="utf-8")
-        matches = content.count(command.old_str)
-        if matches == 0:
+        # Text mode turns "\r\n" and "\r" into "\n", so the byte search is only conclusive without newlines.
+        if (
+            "\n" not in command.old_str
+            and target.stat().st_size >= self._MMAP_REPLACE_THRESHOLD
+            and not self._file_contains(target, command.old_str.encode("utf-8"))
+        ):
             raise MemoryToolOperationError(f"text not found in {command.path}")
-        if matches > 1:
-            raise MemoryToolOperationError(
-                f"text appears {matches} times in {command.path}; must be unique"
-            )
 
-        target.write_text(content.replace(command.old_str, command.new_str), encoding="utf-8")
+        content = target.read_text(encoding="utf-8")
+        new_content = self._replace_unique(content, command.old_str, command.new_str, command.path)
+        target.write_text(new_content, encoding="utf-8")
+        self._index_signatures.pop(os.fspath(target), None)
         return f"File updated: {command.path}"
 
     @override
@@ -141,14 +321,16 @@ class MemoryTool(BetaAbstractMemoryTool):
         if not target.is_file():
             raise MemoryToolOperationError(f"file not found: {command.path}")
 
-        lines = target.read_text(encoding="utf-8").splitlines()
-        if command.insert_line < 0 or command.insert_line > len(lines):
-            raise MemoryToolOperationError(
-                f"insert_line must be between 0 and {len(lines)}, got {command.insert_line}"
-            )
-
-        lines.insert(command.insert_line, command.insert_text.rstrip("\n"))
-        target.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        content = target.read_text(encoding="utf-8")
+        offset, piece = self._insertion_point(content, command.insert_line, command.insert_text)
+        # Appending never touches existing text, so skip the rewrite entirely. The one exception is a
+        # leading "\n" after a trailing "\r" on disk, which would read back as a single "\r\n" break.
+        if offset == len(content) and not (piece.startswith("\n") and content.endswith("\n")):
+            with target.open("a", encoding="utf-8") as fp:
+                fp.write(piece)
+        else:
+            target.write_text(content[:offset] + piece + content[offset:], encoding="utf-8")
+        self._index_signatures.pop(os.fspath(target), None)
         return f"Line inserted in {command.path}"
 
     @override
@@ -161,7 +343,8 @@ class MemoryTool(BetaAbstractMemoryTool):
             target.unlink()
             return f"File deleted: {command.path}"
         if target.is_dir():
-            shutil.rmtree(target)
+            _remove_tree(target)
+            self._known_dirs.clear()
             return f"Directory deleted: {command.path}"
 
         raise MemoryToolOperationError(f"path does not exist: {command.path}")
@@ -170,20 +353,40 @@ class MemoryTool(BetaAbstractMemoryTool):
     def rename(self, command: BetaMemoryTool20250818RenameCommand) -> str:
         source = self._resolve_path(command.old_path)
         destination = self._resolve_path(command.new_path)
+        if source == destination:
+            if not os.path.lexists(source):
+                raise MemoryToolOperationError(f"source path not found: {command.old_path}")
+            return f"Renamed {command.old_path} to {command.new_path}"
+        # Moving a directory invalidates every cached directory below it.
+        self._known_dirs.clear()
 
-        if not source.exists():
-            raise MemoryToolOperationError(f"source path not found: {command.old_path}")
-        if destination.exists():
-            raise MemoryToolOperationError(f"destination already exists: {command.new_path}")
-
-        self._ensure_parent_dir(destination)
-        source.rename(destination)
+        try:
+            try:
+                _rename_noreplace(source, destination)
+            except (FileNotFoundError, NotADirectoryError):
+                # A component of either path is missing, or is a file where a directory is expected.
+                if not source.exists():
+                    raise MemoryToolOperationError(f"source path not found: {command.old_path}") from None
+                # Only the destination's parent is missing: create it and retry once.
+                self._ensure_parent_dir(destination)
+                _rename_noreplace(source, destination)
+        except FileExistsError as exc:
+            raise MemoryToolOperationError(f"destination already exists: {command.new_path}") from exc
+        except OSError as exc:
+            raise MemoryToolOperationError(
+                f"failed to rename {command.old_path} to {command.new_path}: {exc.strerror or exc}"
+            ) from exc
         return f"Renamed {command.old_path} to {command.new_path}"
 
     @override
     def clear_all_memory(self) -> str:
-        if self._memory_root.exists():
-            shutil.rmtree(self._memory_root)
+        try:
+            _remove_tree(self._memory_root)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            raise MemoryToolOperationError(f"failed to clear {self._NAMESPACE_PREFIX}: {exc}") from exc
+        self._known_dirs.clear()
         self._memory_root.mkdir(parents=True, exist_ok=True)
         return "Cleared all memories"
 
@@ -199,6 +402,19 @@ class MemoryTool(BetaAbstractMemoryTool):
             )
         )
 
+    def create_files(self, items: Iterable[tuple[str, str]]) -> None:
+        """Create several files from ``(path, file_text)`` pairs.
+
+        Every path is validated before anything is written, so an invalid path leaves the
+        memory directory untouched; parent directories shared by several files are created once.
+        """
+        targets = [(path, self._resolve_path(path), file_text) for path, file_text in items]
+        for path, target, file_text in targets:
+            if self._edit_handlers_overridden:
+                self.create_file(path, file_text)
+            else:
+                self._write_file(target, file_text)
+
     def view_path(
         self,
         path: str,
@@ -249,6 +465,27 @@ class MemoryTool(BetaAbstractMemoryTool):
             )
         )
 
+    def apply_edits(self, path: str, edits: Iterable[Edit]) -> None:
+        """Apply ``edits`` to the file at ``path`` in order, reading and writing it only once.
+
+        Each edit sees the result of the previous ones. If an edit fails, the edits before it are
+        still written and the error is raised, exactly as if they had been applied one by one.
+        """
+        target = self._resolve_path(path)
+        if not target.is_file():
+            raise MemoryToolOperationError(f"file not found: {path}")
+
+        content = target.read_text(encoding="utf-8")
+        changed = False
+        try:
+            for edit in edits:
+                # Applied one by one, every edit would re-read the text the previous one wrote.
+                content = self._apply_edit(_translate_newlines(content), edit, path)
+                changed = True
+        finally:
+            if changed:
+                self._write_file(target, content)
+
     def memory_exists(self, path: str) -> bool:
         try:
             return self._resolve_path(path).exists()
@@ -262,16 +499,19 @@ class MemoryTool(BetaAbstractMemoryTool):
         if not target.is_dir():
             raise MemoryToolOperationError(f"path is not a directory: {path}")
 
-        results: list[str] = []
-        for item in sorted(target.rglob("*")):
-            if item.name.startswith("."):
+        prefix_len = len(self._memory_root_prefix)
+        # Sorted by path components, matching the order of sorted ``Path`` objects.
+        results: list[tuple[list[str], str]] = []
+        for entry in _iter_tree(os.fspath(target)):
+            if entry.name.startswith("."):
                 continue
-            relative = item.relative_to(self._memory_root)
-            display = f"{self._NAMESPACE_PREFIX}/{relative.as_posix()}"
-            if item.is_dir():
+            parts = entry.path[prefix_len:].split(os.sep)
+            display = f"{self._NAMESPACE_PREFIX}/{'/'.join(parts)}"
+            if entry.is_dir():
                 display += "/"
-            results.append(display)
-        return results
+            results.append((parts, display))
+        results.sort()
+        return [display for _, display in results]
 
     def clear_all(self) -> None:
         self.clear_all_memory()
@@ -281,16 +521,33 @@ class MemoryTool(BetaAbstractMemoryTool):
         if not self._memory_root.exists():
             return totals
 
-        for item in self._memory_root.rglob("*"):
-            if item.name.startswith("."):
+        for entry in _iter_tree(self._memory_root_str):
+            if entry.name.startswith("."):
                 continue
-            if item.is_file():
+            if entry.is_file():
                 totals["files"] += 1
-                totals["bytes"] += item.stat().st_size
-            elif item.is_dir():
+                totals["bytes"] += entry.stat().st_size
+            elif entry.is_dir():
                 totals["directories"] += 1
         return totals
 
+    def search_memory(self, query: str, pattern: str = "*", phrase: bool = False) -> dict[str, list[int]]:
+        """Return ``{path: line numbers}`` for lines containing every word of ``query``, ignoring case.
+
+        With ``phrase=True`` the words must also appear adjacently and in order. ``pattern`` is an
+        ``fnmatch`` glob matched against the ``/memories/...`` path. Files are tokenized on the
+        first search and re-read afterwards only when their size or mtime changes.
+        """
+        self._sync_index()
+        if not phrase:
+            matches = self._index.lookup(query)
+        else:
+            matches = self._index.lookup_phrase(query)
+            tokens = tokenize(query)
+            if len(tokens) > MAX_NGRAM:
+                matches = self._confirm_phrase(matches, tokens)
+        return {path: matches[path] for path in sorted(matches) if fnmatchcase(path, pattern)}
+
     def execute_tool_payload(self, payload: Mapping[str, object]) -> str:
         """Validate and execute a raw tool payload from Anthropic responses."""
         command: BetaMemoryTool20250818Command = self._COMMAND_ADAPTER.validate_python(payload)
@@ -298,6 +555,49 @@ class MemoryTool(BetaAbstractMemoryTool):
         # Always return the string representation of the result
         return str(result)
 
+    @overload
+    def execute_commands(
+        self,
+        commands: Sequence[BetaMemoryTool20250818Command],
+        max_workers: int = ...,
+        *,
+        return_exceptions: Literal[False] = ...,
+    ) -> list[str]: ...
+
+    @overload
+    def execute_commands(
+        self,
+        commands: Sequence[BetaMemoryTool20250818Command],
+        max_workers: int = ...,
+        *,
+        return_exceptions: Literal[True],
+    ) -> list[str | MemoryToolError]: ...
+
+    def execute_commands(
+        self,
+        commands: Sequence[BetaMemoryTool20250818Command],
+        max_workers: int = 1,
+        *,
+        return_exceptions: bool = False,
+    ) -> Sequence[str | MemoryToolError]:
+        """Execute several tool commands (e.g. all tool calls of one response), returning results in order.
+
+        The outcome always matches executing the commands one by one. Consecutive ``create``/
+        ``str_replace``/``insert`` commands on the same file are applied in memory and written once.
+        With ``max_workers`` above 1, batches made only of views run on a thread pool of that size;
+        local views are usually too cheap for that to pay off, so it is opt-in.
+
+        By default the first ``MemoryToolError`` propagates and later commands do not run. With
+        ``return_exceptions=True`` the error is returned in the failing command's slot and the
+        remaining commands still run.
+        """
+        if len(commands) < 2 or max_workers < 2 or any(command.command != "view" for command in commands):
+            return self._execute_sequentially(commands, return_exceptions)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(commands))) as executor:
+            # Views have no side effects, so raising the first error in input order is the sequential outcome.
+            return list(executor.map(partial(self._execute_one, return_exceptions=return_exceptions), commands))
+
     # ------------------------------------------------------------------ #
     # Internal helpers
     # ------------------------------------------------------------------ #
@@ -307,16 +607,271 @@ class MemoryTool(BetaAbstractMemoryTool):
                 f"path must start with {self._NAMESPACE_PREFIX}: {memory_path}"
             )
 
-        relative_part = memory_path[len(self._NAMESPACE_PREFIX):].lstrip("/")
-        base = self._memory_root if not relative_part else self._memory_root / relative_part
+        relative_part = memory_path[self._NAMESPACE_PREFIX_LEN:].lstrip("/")
+        if not relative_part:
+            return self._memory_root
 
+        # String-level join/realpath/prefix check; a Path is only built for the result.
         try:
-            resolved = base.resolve()
-            resolved.relative_to(self._memory_root)
+            resolved = os.path.realpath(os.path.join(self._memory_root_str, relative_part))
         except ValueError as exc:
-            raise MemoryToolPathError(f"path escapes memory root: {memory_path}") from exc
+            raise MemoryToolPathError(f"invalid memory path: {memory_path}") from exc
+        if not resolved.startswith(self._memory_root_prefix):
+            if resolved != self._memory_root_str:
+                raise MemoryToolPathError(f"path escapes memory root: {memory_path}")
+            return self._memory_root
+
+        return Path(resolved)
+
+    def _execute_one(self, command: BetaMemoryTool20250818Command, return_exceptions: bool) -> str | MemoryToolError:
+        try:
+            return str(self.execute(command))
+        except MemoryToolError as exc:
+            if not return_exceptions:
+                raise
+            return exc
+
+    def _execute_sequentially(
+        self,
+        commands: Sequence[BetaMemoryTool20250818Command],
+        return_exceptions: bool,
+    ) -> list[str | MemoryToolError]:
+        results: list[str | MemoryToolError] = []
+        index = 0
+        while index < len(commands):
+            command = commands[index]
+            run_end = index + 1
+            if not self._edit_handlers_overridden and command.command in self._EDIT_COMMANDS:
+                while (
+                    run_end < len(commands)
+                    and commands[run_end].command in self._EDIT_COMMANDS
+                    and getattr(commands[run_end], "path") == getattr(command, "path")
+                ):
+                    run_end += 1
+
+            try:
+                if run_end - index > 1:
+                    self._apply_edit_run(commands[index:run_end], results)
+                else:
+                    results.append(str(self.execute(command)))
+            except MemoryToolError as exc:
+                if not return_exceptions:
+                    raise
+                # Results are appended one per command, so the failed command is the next slot.
+                results.append(exc)
+                run_end = len(results)
+            index = run_end
+        return results
+
+    def _apply_edit_run(
+        self,
+        commands: Sequence[BetaMemoryTool20250818Command],
+        results: list[str | MemoryToolError],
+    ) -> None:
+        """Apply consecutive edits of one file in memory, appending one result per applied command.
+
+        The file is read and written at most once; edits that succeeded before a failing one are
+        still written, exactly as if they had run one by one.
+        """
+        path: str = getattr(commands[0], "path")
+        target = self._resolve_path(path)
+        first_result = len(results)
+        content: str | None = None
+        try:
+            for command in commands:
+                if command.command == "create":
+                    content = command.file_text
+                    results.append(f"File created: {path}")
+                    continue
+
+                if content is None:
+                    if not target.is_file():
+                        raise MemoryToolOperationError(f"file not found: {path}")
+                    content = target.read_text(encoding="utf-8")
+                else:
+                    # Run one by one, this command would re-read the text the previous one wrote.
+                    content = _translate_newlines(content)
+                if command.command == "str_replace":
+                    content = self._apply_edit(content, ReplaceText(command.old_str, command.new_str), path)
+                    results.append(f"File updated: {path}")
+                elif command.command == "insert":
+                    content = self._apply_edit(content, InsertLine(command.insert_line, command.insert_text), path)
+                    results.append(f"Line inserted in {path}")
+        finally:
+            if len(results) > first_result and content is not None:
+                self._write_file(target, content)
+
+    def _sync_index(self) -> None:
+        """Re-index memory files added or changed since the last search and drop removed ones."""
+        seen: set[str] = set()
+        # Same visibility rule as ``list_memories``: dot-named entries are skipped, hidden directories are not.
+        for entry in _iter_tree(self._memory_root_str):
+            if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if self._index_signatures.get(entry.path) != signature:
+                    with open(entry.path, encoding="utf-8", errors="replace") as fp:
+                        self._index.update(self._display_path(entry.path), fp.read())
+                    self._index_signatures[entry.path] = signature
+            except FileNotFoundError:
+                continue
+            seen.add(entry.path)
+
+        for fs_path in self._index_signatures.keys() - seen:
+            del self._index_signatures[fs_path]
+            self._index.remove(self._display_path(fs_path))
+
+    def _confirm_phrase(self, candidates: Mapping[str, list[int]], tokens: list[str]) -> dict[str, list[int]]:
+        """Keep only the candidate lines whose tokens contain ``tokens`` as a contiguous run."""
+        needle = f" {' '.join(tokens)} "
+        confirmed: dict[str, list[int]] = {}
+        for path, line_nos in candidates.items():
+            lines = self._resolve_path(path).read_text(encoding="utf-8", errors="replace").splitlines()
+            hits = [
+                line_no
+                for line_no in line_nos
+                if line_no <= len(lines) and needle in f" {' '.join(tokenize(lines[line_no - 1]))} "
+            ]
+            if hits:
+                confirmed[path] = hits
+        return confirmed
+
+    def _display_path(self, fs_path: str) -> str:
+        relative = fs_path[len(self._memory_root_prefix):]
+        if os.sep != "/":
+            relative = relative.replace(os.sep, "/")
+        return f"{self._NAMESPACE_PREFIX}/{relative}"
+
+    def _write_file(self, target: Path, text: str) -> None:
+        self._ensure_parent_dir(target)
+        try:
+            target.write_text(text, encoding="utf-8")
+        except FileNotFoundError:
+            # The cached parent directory was removed behind our back; recreate it and retry once.
+            self._known_dirs.clear()
+            self._ensure_parent_dir(target)
+            target.write_text(text, encoding="utf-8")
+        # Same-size rewrites can keep the mtime on coarse-grained filesystems, so force a re-index.
+        self._index_signatures.pop(os.fspath(target), None)
+
+    def _apply_edit(self, content: str, edit: Edit, path: str) -> str:
+        if isinstance(edit, ReplaceText):
+            return self._replace_unique(content, edit.old, edit.new, path)
+        if isinstance(edit, InsertLine):
+            offset, piece = self._insertion_point(content, edit.line, edit.text)
+            return content[:offset] + piece + content[offset:]
+        if isinstance(edit, DeleteLine):
+            start, end = self._line_span(content, edit.line)
+            return content[:start] + content[end:]
+        raise TypeError(f"unsupported edit: {edit!r}")
+
+    @staticmethod
+    def _replace_unique(content: str, old_text: str, new_text: str, path: str) -> str:
+        """Return ``content`` with the single occurrence of ``old_text`` replaced."""
+        old_len = len(old_text)
+        # Step past empty matches so an empty ``old_text`` is not found twice at one offset.
+        step = old_len or 1
+        first = content.find(old_text)
+        if first < 0:
+            raise MemoryToolOperationError(f"text not found in {path}")
+        second = content.find(old_text, first + step)
+        if second >= 0:
+            # Only pay for a full count on the error path.
+            matches = 2 + content.count(old_text, second + step)
+            raise MemoryToolOperationError(
+                f"text appears {matches} times in {path}; must be unique"
+            )
+        return content[:first] + new_text + content[first + old_len:]
 
-        return resolved
+    def _insertion_point(self, content: str, line_index: int, insert_text: str) -> tuple[int, str]:
+        """Return the offset and text to splice into ``content`` to insert a line at ``line_index``."""
+        line_count, has_trailing_break, start, _ = self._line_layout(content, line_index)
+        if line_index < 0 or line_index > line_count:
+            raise MemoryToolOperationError(
+                f"insert_line must be between 0 and {line_count}, got {line_index}"
+            )
+
+        new_line = insert_text.rstrip("\n") + "\n"
+        if line_index == line_count and content and not has_trailing_break:
+            return start, "\n" + new_line
+        return start, new_line
+
+    def _line_span(self, content: str, line_no: int) -> tuple[int, int]:
+        """Return the offsets of line ``line_no`` (1-based) in ``content``, including its line break."""
+        line_count, _, start, end = self._line_layout(content, line_no - 1)
+        if line_no < 1 or line_no > line_count:
+            raise MemoryToolOperationError(f"line must be between 1 and {line_count}, got {line_no}")
+        return start, end
+
+    @staticmethod
+    def _line_layout(content: str, line_index: int) -> tuple[int, bool, int, int]:
+        """Describe ``content`` as ``view`` numbers it, in a single pass.
+
+        Returns the line count, whether the last line ends in a break, and the start and end offsets
+        of the ``line_index``-th line (0-based, clamped to the file; both are ``len(content)`` past the end).
+        """
+        if not any(separator in content for separator in _EXTRA_LINE_BREAKS):
+            has_trailing_break = content.endswith("\n")
+            line_count = content.count("\n") + (0 if not content or has_trailing_break else 1)
+            line_index = min(max(line_index, 0), line_count)
+            if line_index == line_count:
+                return line_count, has_trailing_break, len(content), len(content)
+            # ``split`` finds the N-th "\n" in C; only the length of the remainder is needed.
+            start = len(content) - len(content.split("\n", line_index)[-1])
+            end = content.find("\n", start) + 1
+            return line_count, has_trailing_break, start, end or len(content)
+
+        lines = content.splitlines(keepends=True)
+        line_index = min(max(line_index, 0), len(lines))
+        start = sum(map(len, lines[:line_index]))
+        end = start + len(lines[line_index]) if line_index < len(lines) else start
+        return len(lines), content[-1:] in _LINE_BREAKS, start, end
 
     def _ensure_parent_dir(self, target: Path) -> None:
+        parent = os.path.dirname(target)
+        try:
+            self._known_dirs.move_to_end(parent)
+            return
+        except KeyError:
+            # Not created yet, or evicted from the cache.
+            pass
+
         target.parent.mkdir(parents=True, exist_ok=True)
+        self._known_dirs[parent] = None
+        if len(self._known_dirs) > self._KNOWN_DIRS_MAXSIZE:
+            self._known_dirs.popitem(last=False)
+
+    @staticmethod
+    def _line_start_offset(data: bytes | mmap.mmap, line_index: int, start: int = 0) -> int:
+        """Return the offset of the ``line_index``-th line after ``start``, or ``len(data)`` past the end."""
+        offset = start
+        for _ in range(line_index):
+            newline = data.find(b"\n", offset)
+            if newline < 0:
+                return len(data)
+            offset = newline + 1
+        return offset
+
+    def _slice_lines(self, data: bytes | mmap.mmap, start_line: int, end_line: int | None) -> list[str]:
+        """Decode only lines ``[start_line, end_line)`` of ``data``, skipping earlier lines by offset."""
+        start_offset = self._line_start_offset(data, start_line)
+        end_offset = len(data) if end_line is None else self._line_start_offset(data, end_line - start_line, start_offset)
+        # Offsets only track "\n". Other separators can only end lines earlier, so ones past ``end_offset``
+        # cannot shift the window; ones before it mean splitting that prefix the way unranged views do.
+        if _LONE_CARRIAGE_RETURN.search(data, 0, end_offset) is not None or any(
+            data.find(separator, 0, end_offset) >= 0 for separator in _EXTRA_LINE_BREAKS_UTF8
+        ):
+            return data[:end_offset].decode("utf-8").splitlines()[start_line:end_line]
+        return data[start_offset:end_offset].decode("utf-8").splitlines()
+
+    @staticmethod
+    def _file_contains(target: Path, needle: bytes) -> bool:
+        with target.open("rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped.find(needle) >= 0
+
+    def _read_line_range(self, target: Path, start_line: int, end_line: int | None) -> list[str]:
+        """Decode only lines ``[start_line, end_line)`` of ``target`` via a read-only mmap."""
+        with target.open("rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return self._slice_lines(mapped, start_line, end_line)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import sys
+import types
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+from pydantic import BaseModel, ConfigDict
+
+if sys.version_info < (3, 10):
+    from typing import Optional as _Optional
+
+    MaybeStr = _Optional[str]
+    MaybeInt = _Optional[int]
+    MaybeRange = _Optional[list[int]]
+else:
+    MaybeStr = str | None
+    MaybeInt = int | None
+    MaybeRange = list[int] | None
+
+# Installed when pytest imports this conftest, i.e. before any test module imports ``memorylake.memorytool``
+# or the example chat, so the suite runs without the anthropic SDK. A real SDK that is already imported wins.
+if "anthropic" not in sys.modules:
+    anthropic_module = types.ModuleType("anthropic")
+    sys.modules["anthropic"] = anthropic_module
+
+    class _DummyMessages:
+        def create(self, **_: Any) -> types.SimpleNamespace:
+            return types.SimpleNamespace(content=[])
+
+    class _DummyBeta:
+        def __init__(self) -> None:
+            self.messages: _DummyMessages = _DummyMessages()
+
+    class Anthropic:
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            self.beta: _DummyBeta = _DummyBeta()
+
+    anthropic_module_any: Any = anthropic_module
+    anthropic_module_any.Anthropic = Anthropic
+
+    anthropic_lib_module = types.ModuleType("anthropic.lib")
+    anthropic_module_any.lib = anthropic_lib_module
+    sys.modules["anthropic.lib"] = anthropic_lib_module
+
+    anthropic_lib_tools_module = types.ModuleType("anthropic.lib.tools")
+    anthropic_lib_module_any: Any = anthropic_lib_module
+    anthropic_lib_module_any.tools = anthropic_lib_tools_module
+    sys.modules["anthropic.lib.tools"] = anthropic_lib_tools_module
+
+    anthropic_types_module = types.ModuleType("anthropic.types")
+    anthropic_module_any.types = anthropic_types_module
+    sys.modules["anthropic.types"] = anthropic_types_module
+
+    anthropic_types_beta_module = types.ModuleType("anthropic.types.beta")
+    anthropic_types_module_any: Any = anthropic_types_module
+    anthropic_types_module_any.beta = anthropic_types_beta_module
+    sys.modules["anthropic.types.beta"] = anthropic_types_beta_module
+
+    class BetaAbstractMemoryTool:
+        def __init__(self) -> None:
+            pass
+
+        def execute(self, command: "BetaMemoryTool20250818Command") -> Any:
+            handler = getattr(self, command.command)
+            return handler(command)
+
+    setattr(anthropic_lib_tools_module, "BetaAbstractMemoryTool", BetaAbstractMemoryTool)
+
+    class BetaMemoryTool20250818Command(BaseModel):
+        command: str
+        path: MaybeStr = None
+        file_text: MaybeStr = None
+        insert_line: MaybeInt = None
+        insert_text: MaybeStr = None
+        old_str: MaybeStr = None
+        new_str: MaybeStr = None
+        old_path: MaybeStr = None
+        new_path: MaybeStr = None
+        view_range: MaybeRange = None
+
+        model_config: ClassVar[ConfigDict] = ConfigDict(extra="allow")
+
+    class BetaMemoryTool20250818ViewCommand(BetaMemoryTool20250818Command):
+        command: str = "view"
+        path: MaybeStr = None
+
+    class BetaMemoryTool20250818CreateCommand(BetaMemoryTool20250818Command):
+        command: str = "create"
+        path: MaybeStr = None
+        file_text: MaybeStr = None
+
+    class BetaMemoryTool20250818StrReplaceCommand(BetaMemoryTool20250818Command):
+        command: str = "str_replace"
+        path: MaybeStr = None
+        old_str: MaybeStr = None
+        new_str: MaybeStr = None
+
+    class BetaMemoryTool20250818InsertCommand(BetaMemoryTool20250818Command):
+        command: str = "insert"
+        path: MaybeStr = None
+        insert_line: MaybeInt = None
+        insert_text: MaybeStr = None
+
+    class BetaMemoryTool20250818DeleteCommand(BetaMemoryTool20250818Command):
+        command: str = "delete"
+        path: MaybeStr = None
+
+    class BetaMemoryTool20250818RenameCommand(BetaMemoryTool20250818Command):
+        command: str = "rename"
+        old_path: MaybeStr = None
+        new_path: MaybeStr = None
+
+    anthropic_types_beta_any: Any = anthropic_types_beta_module
+    anthropic_types_beta_any.BetaContentBlockParam = dict
+    anthropic_types_beta_any.BetaMessageParam = dict
+    anthropic_types_beta_any.BetaMemoryTool20250818Command = BetaMemoryTool20250818Command
+    anthropic_types_beta_any.BetaMemoryTool20250818CreateCommand = BetaMemoryTool20250818CreateCommand
+    anthropic_types_beta_any.BetaMemoryTool20250818DeleteCommand = BetaMemoryTool20250818DeleteCommand
+    anthropic_types_beta_any.BetaMemoryTool20250818InsertCommand = BetaMemoryTool20250818InsertCommand
+    anthropic_types_beta_any.BetaMemoryTool20250818RenameCommand = BetaMemoryTool20250818RenameCommand
+    anthropic_types_beta_any.BetaMemoryTool20250818StrReplaceCommand = BetaMemoryTool20250818StrReplaceCommand
+    anthropic_types_beta_any.BetaMemoryTool20250818ViewCommand = BetaMemoryTool20250818ViewCommand
+
+
+@pytest.fixture
+def write_text_calls(monkeypatch: pytest.MonkeyPatch) -> list[tuple[Path, str]]:
+    """Record ``(path, data)`` for every ``Path.write_text`` call made during the test."""
+    calls: list[tuple[Path, str]] = []
+    original_write_text = Path.write_text
+
+    def _recording_write_text(self: Path, data: str, *args: Any, **kwargs: Any) -> int:
+        calls.append((self, data))
+        return original_write_text(self, data, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "write_text", _recording_write_text)
+    return calls
+
+
+@pytest.fixture
+def read_text_calls(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    """Record the path of every ``Path.read_text`` call made during the test."""
+    calls: list[Path] = []
+    original_read_text = Path.read_text
+
+    def _recording_read_text(self: Path, *args: Any, **kwargs: Any) -> str:
+        calls.append(self)
+        return original_read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", _recording_read_text)
+    return calls
@@ -1,134 +1,24 @@
 from __future__ import annotations
 
-import sys
-import types
-from typing import Any, ClassVar
+import shutil
+from pathlib import Path
+from typing import Any
 
 import pytest
-from pydantic import BaseModel, ConfigDict
-
-if sys.version_info < (3, 10):
-    from typing import Optional as _Optional
-
-    MaybeStr = _Optional[str]
-    MaybeInt = _Optional[int]
-    MaybeRange = _Optional[list[int]]
-else:
-    MaybeStr = str | None
-    MaybeInt = int | None
-    MaybeRange = list[int] | None
-
-if "anthropic" not in sys.modules:
-    anthropic_module = types.ModuleType("anthropic")
-    sys.modules["anthropic"] = anthropic_module
-
-    class _DummyMessages:
-        def create(self, **_: Any) -> types.SimpleNamespace:
-            return types.SimpleNamespace(content=[])
-
-    class _DummyBeta:
-        def __init__(self) -> None:
-            self.messages: _DummyMessages = _DummyMessages()
-
-    class Anthropic:
-        def __init__(self, *args: Any, **kwargs: Any) -> None:
-            self.beta: _DummyBeta = _DummyBeta()
-
-    anthropic_module_any: Any = anthropic_module
-    anthropic_module_any.Anthropic = Anthropic
-
-    anthropic_lib_module = types.ModuleType("anthropic.lib")
-    anthropic_module_any.lib = anthropic_lib_module
-    sys.modules["anthropic.lib"] = anthropic_lib_module
-
-    anthropic_lib_tools_module = types.ModuleType("anthropic.lib.tools")
-    anthropic_lib_module_any: Any = anthropic_lib_module
-    anthropic_lib_module_any.tools = anthropic_lib_tools_module
-    sys.modules["anthropic.lib.tools"] = anthropic_lib_tools_module
-
-    anthropic_types_module = types.ModuleType("anthropic.types")
-    anthropic_module_any.types = anthropic_types_module
-    sys.modules["anthropic.types"] = anthropic_types_module
-
-    anthropic_types_beta_module = types.ModuleType("anthropic.types.beta")
-    anthropic_types_module_any: Any = anthropic_types_module
-    anthropic_types_module_any.beta = anthropic_types_beta_module
-    sys.modules["anthropic.types.beta"] = anthropic_types_beta_module
-
-    class BetaAbstractMemoryTool:
-        def __init__(self) -> None:
-            pass
-
-        def execute(self, command: "BetaMemoryTool20250818Command") -> Any:
-            handler = getattr(self, command.command)
-            return handler(command)
-
-    setattr(anthropic_lib_tools_module, "BetaAbstractMemoryTool", BetaAbstractMemoryTool)
-
-    class BetaMemoryTool20250818Command(BaseModel):
-        command: str
-        path: MaybeStr = None
-        file_text: MaybeStr = None
-        insert_line: MaybeInt = None
-        insert_text: MaybeStr = None
-        old_str: MaybeStr = None
-        new_str: MaybeStr = None
-        old_path: MaybeStr = None
-        new_path: MaybeStr = None
-        view_range: MaybeRange = None
-
-        model_config: ClassVar[ConfigDict] = ConfigDict(extra="allow")
-
-    class BetaMemoryTool20250818ViewCommand(BetaMemoryTool20250818Command):
-        command: str = "view"
-        path: MaybeStr = None
-
-    class BetaMemoryTool20250818CreateCommand(BetaMemoryTool20250818Command):
-        command: str = "create"
-        path: MaybeStr = None
-        file_text: MaybeStr = None
-
-    class BetaMemoryTool20250818StrReplaceCommand(BetaMemoryTool20250818Command):
-        command: str = "str_replace"
-        path: MaybeStr = None
-        old_str: MaybeStr = None
-        new_str: MaybeStr = None
-
-    class BetaMemoryTool20250818InsertCommand(BetaMemoryTool20250818Command):
-        command: str = "insert"
-        path: MaybeStr = None
-        insert_line: MaybeInt = None
-        insert_text: MaybeStr = None
-
-    class BetaMemoryTool20250818DeleteCommand(BetaMemoryTool20250818Command):
-        command: str = "delete"
-        path: MaybeStr = None
-
-    class BetaMemoryTool20250818RenameCommand(BetaMemoryTool20250818Command):
-        command: str = "rename"
-        old_path: MaybeStr = None
-        new_path: MaybeStr = None
-
-    anthropic_types_beta_any: Any = anthropic_types_beta_module
-    anthropic_types_beta_any.BetaContentBlockParam = dict
-    anthropic_types_beta_any.BetaMessageParam = dict
-    anthropic_types_beta_any.BetaMemoryTool20250818Command = BetaMemoryTool20250818Command
-    anthropic_types_beta_any.BetaMemoryTool20250818CreateCommand = BetaMemoryTool20250818CreateCommand
-    anthropic_types_beta_any.BetaMemoryTool20250818DeleteCommand = BetaMemoryTool20250818DeleteCommand
-    anthropic_types_beta_any.BetaMemoryTool20250818InsertCommand = BetaMemoryTool20250818InsertCommand
-    anthropic_types_beta_any.BetaMemoryTool20250818RenameCommand = BetaMemoryTool20250818RenameCommand
-    anthropic_types_beta_any.BetaMemoryTool20250818StrReplaceCommand = BetaMemoryTool20250818StrReplaceCommand
-    anthropic_types_beta_any.BetaMemoryTool20250818ViewCommand = BetaMemoryTool20250818ViewCommand
-
 
 from example import chat as chat_example
+from memorylake.index import InvertedIndex
 from memorylake.memorytool import (
+    DeleteLine,
+    InsertLine,
     MemoryTool,
     MemoryToolOperationError,
     MemoryToolPathError,
+    ReplaceText,
 )
 
 handle_local_command = getattr(chat_example, "_handle_local_command")
+execute_local_command = getattr(chat_example, "_execute_local_command")
 run_exec_command = getattr(chat_example, "_run_exec_command")
 
 
@@ -191,22 +81,486 @@ def test_example_local_commands_and_exec(tmp_path: Any, capsys: pytest.CaptureFi
         "memory-view": "",
     }
 
-    assert handle_local_command("/memory-create /memories/demo.txt hello", tool, menu)
-    output = capsys.readouterr().out
-    assert "Created" in output
+    assert execute_local_command("/memory-create /memories/demo.txt hello", tool, menu).text == "Created"
+    assert execute_local_command("/memory-list", tool, menu).text == "/memories/demo.txt"
+    assert execute_local_command("/memory-view /memories/demo.txt 1 -1", tool, menu).text.startswith("File: /memories/demo.txt")
+    assert execute_local_command("/memory-search HELLO", tool, menu).text == "/memories/demo.txt: lines 1"
+
+    result = execute_local_command("/memory-view /memories/missing.txt 1 2", tool, menu)
+    assert not result.ok
+    assert result.text.startswith("Error: ")
+
+    result = run_exec_command(tool, ["rename", "/memories/demo.txt", "/memories/demo2.txt"])
+    assert result.ok
+    assert result.text.startswith("Renamed")
+    assert run_exec_command(tool, ["delete", "/memories/demo2.txt"]).text.startswith("File deleted")
+
+    # The interactive wrapper prints the result text.
+    assert handle_local_command("/help", tool, menu)
+    assert capsys.readouterr().out.startswith("Local commands:\n/help - help\n")
+
+
+def test_memorytool_replace_text_requires_unique_match(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/dup.txt", "tea, tea, tea and coffee")
+
+    with pytest.raises(MemoryToolOperationError, match="appears 3 times"):
+        tool.replace_text("/memories/dup.txt", "tea", "water")
+
+    tool.replace_text("/memories/dup.txt", "coffee", "juice")
+    assert "tea, tea, tea and juice" in tool.view_path("/memories/dup.txt")
+
+
+def test_memorytool_insert_line_positions(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    note = tmp_path / "memories" / "lines.txt"
+    tool.create_file("/memories/lines.txt", "alpha\ngamma")
+
+    tool.insert_line("/memories/lines.txt", 1, "beta")
+    assert note.read_text(encoding="utf-8") == "alpha\nbeta\ngamma"
+
+    tool.insert_line("/memories/lines.txt", 3, "delta\n")
+    assert note.read_text(encoding="utf-8") == "alpha\nbeta\ngamma\ndelta\n"
+
+    tool.insert_line("/memories/lines.txt", 0, "start")
+    assert note.read_text(encoding="utf-8") == "start\nalpha\nbeta\ngamma\ndelta\n"
+
+    with pytest.raises(MemoryToolOperationError, match="between 0 and 5"):
+        tool.insert_line("/memories/lines.txt", 6, "too far")
+
+    # Appending "\n" to a file ending in "\r" would merge the two into one "\r\n" break.
+    (tmp_path / "memories" / "cr.txt").write_bytes(b"one\r")
+    tool.insert_line("/memories/cr.txt", 1, "")
+    assert tool.view_path("/memories/cr.txt").splitlines()[1:] == ["   1: one", "   2: "]
+
+
+def test_memorytool_view_range_uses_mmap_for_large_files(tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/big.txt", "".join(f"line {idx}\n" for idx in range(1, 51)))
+    expected = tool.view_path("/memories/big.txt", view_range=(10, 12))
+
+    monkeypatch.setattr(MemoryTool, "_MMAP_VIEW_THRESHOLD", 1)
+    assert tool.view_path("/memories/big.txt", view_range=(10, 12)) == expected
+    assert "  12: line 12" in expected
+    assert "line 13" not in expected
+
+    tail = tool.view_path("/memories/big.txt", view_range=(49, -1))
+    assert tail.splitlines()[1:] == ["  49: line 49", "  50: line 50"]
+
+    monkeypatch.setattr(MemoryTool, "_MMAP_VIEW_THRESHOLD", 1 << 20)
+    tool.create_file("/memories/short.txt", "one\ntwo\nthree")
+    assert tool.view_path("/memories/short.txt", view_range=(2, 3)).splitlines()[1:] == ["   2: two", "   3: three"]
+    assert tool.view_path("/memories/short.txt", view_range=(10, 12)).endswith("(empty file)")
+
+
+def test_memorytool_rename_never_overwrites(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/a.txt", "a")
+    tool.create_file("/memories/b.txt", "b")
 
-    assert handle_local_command("/memory-list", tool, menu)
-    output = capsys.readouterr().out
-    assert "/memories/demo.txt" in output
+    with pytest.raises(MemoryToolOperationError, match="destination already exists"):
+        tool.rename_path("/memories/a.txt", "/memories/b.txt")
+    assert "   1: b" in tool.view_path("/memories/b.txt")
 
-    assert handle_local_command("/memory-view /memories/demo.txt 1 -1", tool, menu)
-    output = capsys.readouterr().out
-    assert "File: /memories/demo.txt" in output
+    with pytest.raises(MemoryToolOperationError, match="source path not found"):
+        tool.rename_path("/memories/missing.txt", "/memories/new/missing.txt")
+    assert not tool.memory_exists("/memories/new")
 
-    run_exec_command(tool, ["rename", "/memories/demo.txt", "/memories/demo2.txt"])
-    output = capsys.readouterr().out
-    assert "Renamed" in output
+    tool.rename_path("/memories/a.txt", "/memories//a.txt")
+    assert "   1: a" in tool.view_path("/memories/a.txt")
+    with pytest.raises(MemoryToolOperationError, match="source path not found"):
+        tool.rename_path("/memories/missing.txt", "/memories/missing.txt")
+
+    tool.rename_path("/memories/a.txt", "/memories/nested/dir/a.txt")
+    assert tool.memory_exists("/memories/nested/dir/a.txt")
+
+    tool.create_file("/memories/d", "a file, not a directory")
+    with pytest.raises(MemoryToolOperationError, match="source path not found"):
+        tool.rename_path("/memories/d/e", "/memories/b2.txt")
+    with pytest.raises(MemoryToolOperationError, match="failed to rename"):
+        tool.rename_path("/memories/nested", "/memories/nested/dir/inside")
+    assert tool.memory_exists("/memories/nested/dir/a.txt")
+
+
+def test_memorytool_clear_all_removes_nested_tree(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep.txt").write_text("keep", encoding="utf-8")
+
+    tool.create_file("/memories/a/b/c.txt", "deep")
+    tool.create_file("/memories/.hidden/x.txt", "hidden")
+    (tmp_path / "memories" / "a" / "link").symlink_to(outside, target_is_directory=True)
+
+    tool.clear_all()
+    assert tool.list_memories() == []
+    assert (outside / "keep.txt").read_text(encoding="utf-8") == "keep"
+
+
+def test_memorytool_clear_all_refuses_symlinked_root(tmp_path: Any) -> None:
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep.txt").write_text("keep", encoding="utf-8")
+    (tmp_path / "base").mkdir()
+    (tmp_path / "base" / "memories").symlink_to(outside, target_is_directory=True)
+    tool = MemoryTool(base_path=tmp_path / "base")
+
+    with pytest.raises(MemoryToolOperationError, match="symbolic link"):
+        tool.clear_all_memory()
+    assert (outside / "keep.txt").read_text(encoding="utf-8") == "keep"
+
+
+def test_memorytool_delete_directory(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/projects/a/notes.txt", "a")
+    tool.create_file("/memories/projects/b.txt", "b")
+
+    result = tool.execute_tool_payload({"command": "delete", "path": "/memories/projects"})
+    assert result == "Directory deleted: /memories/projects"
+    assert tool.list_memories() == []
+
+    with pytest.raises(MemoryToolPathError):
+        tool.delete_path("/memories/")
+
+
+def test_memorytool_rejects_paths_outside_memory_root(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    (tmp_path / "secret.txt").write_text("secret", encoding="utf-8")
+    (tmp_path / "memories" / "escape").symlink_to(tmp_path)
+
+    for bad_path in ("/memories/../secret.txt", "/memories/a/../../secret.txt", "/memories/escape/secret.txt"):
+        with pytest.raises(MemoryToolPathError, match="escapes memory root"):
+            tool.view_path(bad_path)
+
+    assert tool.view_path("/memories/a/..").startswith("Directory: /memories/a/..")
+    assert tool.view_path("/memories//") == "Directory: /memories//\n- escape/"
+
+
+def test_memorytool_create_recovers_from_externally_removed_directory(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/topic/one.txt", "one")
 
-    run_exec_command(tool, ["delete", "/memories/demo2.txt"])
-    output = capsys.readouterr().out
-    assert "File deleted" in output
+    shutil.rmtree(tmp_path / "memories" / "topic")
+    tool.create_file("/memories/topic/two.txt", "two")
+    assert tool.list_memories() == ["/memories/topic/", "/memories/topic/two.txt"]
+
+    tool.rename_path("/memories/topic", "/memories/renamed")
+    tool.create_file("/memories/topic/three.txt", "three")
+    assert tool.memory_exists("/memories/topic/three.txt")
+
+
+def test_memorytool_execute_commands_preserves_order(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    command_adapter = getattr(MemoryTool, "_COMMAND_ADAPTER")
+
+    independent = [
+        command_adapter.validate_python({"command": "create", "path": f"/memories/f{idx}.txt", "file_text": f"text {idx}"})
+        for idx in range(5)
+    ]
+    assert tool.execute_commands(independent) == [f"File created: /memories/f{idx}.txt" for idx in range(5)]
+
+    dependent = [
+        command_adapter.validate_python(payload)
+        for payload in (
+            {"command": "create", "path": "/memories/chain.txt", "file_text": "one"},
+            {"command": "str_replace", "path": "/memories/chain.txt", "old_str": "one", "new_str": "two"},
+            {"command": "insert", "path": "/memories/chain.txt", "insert_line": 1, "insert_text": "three"},
+            {"command": "view", "path": "/memories/chain.txt"},
+        )
+    ]
+    results = tool.execute_commands(dependent)
+    assert results[:3] == [
+        "File created: /memories/chain.txt",
+        "File updated: /memories/chain.txt",
+        "Line inserted in /memories/chain.txt",
+    ]
+    assert results[3] == "File: /memories/chain.txt\n   1: two\n   2: three"
+
+
+def test_memorytool_execute_commands_coalesces_edits_to_one_file(
+    tmp_path: Any,
+    write_text_calls: list[tuple[Path, str]],
+) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    command_adapter = getattr(MemoryTool, "_COMMAND_ADAPTER")
+    tool.create_file("/memories/notes.txt", "alpha\n")
+    write_text_calls.clear()
+
+    commands = [
+        command_adapter.validate_python(payload)
+        for payload in (
+            {"command": "str_replace", "path": "/memories/notes.txt", "old_str": "alpha", "new_str": "beta"},
+            {"command": "insert", "path": "/memories/notes.txt", "insert_line": 0, "insert_text": "first"},
+            {"command": "str_replace", "path": "/memories/notes.txt", "old_str": "missing", "new_str": "x"},
+            {"command": "insert", "path": "/memories/notes.txt", "insert_line": 0, "insert_text": "never"},
+        )
+    ]
+    with pytest.raises(MemoryToolOperationError, match="text not found"):
+        tool.execute_commands(commands)
+
+    assert len(write_text_calls) == 1
+    assert (tmp_path / "memories" / "notes.txt").read_text(encoding="utf-8") == "first\nbeta\n"
+
+
+def test_memorytool_execute_commands_failures_match_sequential_execution(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    command_adapter = getattr(MemoryTool, "_COMMAND_ADAPTER")
+    tool.create_file("/memories/notes.txt", "alpha\n")
+
+    failing_first = [
+        command_adapter.validate_python({"command": "str_replace", "path": "/memories/missing.txt", "old_str": "a", "new_str": "b"}),
+        command_adapter.validate_python({"command": "create", "path": "/memories/b.txt", "file_text": "b"}),
+    ]
+    with pytest.raises(MemoryToolOperationError, match="file not found"):
+        tool.execute_commands(failing_first)
+    assert not tool.memory_exists("/memories/b.txt")
+
+    bad_path_last = [
+        command_adapter.validate_python({"command": "create", "path": "/memories/c.txt", "file_text": "c"}),
+        command_adapter.validate_python({"command": "view", "path": "/etc/passwd"}),
+    ]
+    with pytest.raises(MemoryToolPathError):
+        tool.execute_commands(bad_path_last)
+    assert tool.memory_exists("/memories/c.txt")
+
+    mixed = [
+        command_adapter.validate_python(payload)
+        for payload in (
+            {"command": "str_replace", "path": "/memories/notes.txt", "old_str": "alpha", "new_str": "beta"},
+            {"command": "str_replace", "path": "/memories/notes.txt", "old_str": "missing", "new_str": "x"},
+            {"command": "insert", "path": "/memories/notes.txt", "insert_line": 0, "insert_text": "first"},
+            {"command": "view", "path": "/etc/passwd"},
+            {"command": "view", "path": "/memories/notes.txt"},
+        )
+    ]
+    results = tool.execute_commands(mixed, return_exceptions=True)
+    assert results[0] == "File updated: /memories/notes.txt"
+    assert isinstance(results[1], MemoryToolOperationError)
+    assert results[2] == "Line inserted in /memories/notes.txt"
+    assert isinstance(results[3], MemoryToolPathError)
+    assert results[4] == "File: /memories/notes.txt\n   1: first\n   2: beta"
+
+    views = [command_adapter.validate_python({"command": "view", "path": path}) for path in ("/memories/nope.txt", "/memories/c.txt")]
+    view_results = tool.execute_commands(views, max_workers=4, return_exceptions=True)
+    assert isinstance(view_results[0], MemoryToolOperationError)
+    assert view_results[1] == "File: /memories/c.txt\n   1: c"
+
+
+def test_memorytool_batched_edits_reread_line_endings_like_sequential_execution(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    command_adapter = getattr(MemoryTool, "_COMMAND_ADAPTER")
+    tool.create_file("/memories/notes.txt", "x\ny\n")
+    commands = [
+        command_adapter.validate_python(payload)
+        for payload in (
+            {"command": "str_replace", "path": "/memories/notes.txt", "old_str": "y\n", "new_str": "z\r\n"},
+            {"command": "str_replace", "path": "/memories/notes.txt", "old_str": "z\r\n", "new_str": "y\n"},
+        )
+    ]
+    # One by one, the second command re-reads the file, where "\r\n" has become "\n".
+    results = tool.execute_commands(commands, return_exceptions=True)
+    assert results[0] == "File updated: /memories/notes.txt"
+    assert isinstance(results[1], MemoryToolOperationError)
+    assert tool.view_path("/memories/notes.txt").splitlines()[1:] == ["   1: x", "   2: z"]
+
+    with pytest.raises(MemoryToolOperationError, match="text not found"):
+        tool.apply_edits("/memories/notes.txt", [ReplaceText("z", "w\r"), ReplaceText("w\r", "v")])
+    assert tool.view_path("/memories/notes.txt").splitlines()[1:] == ["   1: x", "   2: w"]
+
+
+def test_inverted_index_update_lookup_and_remove() -> None:
+    index = InvertedIndex()
+    index.update("/memories/a.txt", "Python is great\nI like python and FastAPI\n")
+    index.update("/memories/b.txt", "FastAPI framework")
+
+    assert index.lookup("python") == {"/memories/a.txt": [1, 2]}
+    assert index.lookup("PYTHON fastapi") == {"/memories/a.txt": [2]}
+    assert index.lookup("fastapi") == {"/memories/a.txt": [2], "/memories/b.txt": [1]}
+    assert index.lookup("rust") == {}
+    assert index.lookup(" ,. ") == {}
+
+    index.update("/memories/a.txt", "nothing here")
+    assert index.lookup("python") == {}
+    index.remove("/memories/b.txt")
+    assert "/memories/b.txt" not in index
+    assert index.lookup("fastapi") == {}
+    assert len(index) == 1
+
+
+def test_memorytool_search_memory_tracks_changes(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/notes/a.txt", "Python tips\nuse venv")
+    tool.create_file("/memories/notes/b.md", "python and rust")
+    (tmp_path / "memories" / ".hidden.txt").write_text("python", encoding="utf-8")
+    tool.create_file("/memories/.private/c.txt", "python inside a hidden directory")
+
+    # Dot-named files are skipped like in ``list_memories``, but files inside hidden directories are searched.
+    assert "/memories/.private/c.txt" in tool.list_memories()
+    assert tool.search_memory("python") == {
+        "/memories/.private/c.txt": [1],
+        "/memories/notes/a.txt": [1],
+        "/memories/notes/b.md": [1],
+    }
+    tool.delete_path("/memories/.private")
+    assert tool.search_memory("python", pattern="*.md") == {"/memories/notes/b.md": [1]}
+
+    tool.replace_text("/memories/notes/a.txt", "Python", "Go")
+    tool.insert_line("/memories/notes/b.md", 0, "Python first")
+    (tmp_path / "memories" / "outside.txt").write_text("edited python", encoding="utf-8")
+    assert tool.search_memory("python") == {"/memories/notes/b.md": [1, 2], "/memories/outside.txt": [1]}
+
+    tool.rename_path("/memories/notes/b.md", "/memories/archive/b.md")
+    tool.delete_path("/memories/outside.txt")
+    assert tool.search_memory("python rust") == {"/memories/archive/b.md": [2]}
+
+    tool.clear_all()
+    assert tool.search_memory("python") == {}
+
+
+def test_memorytool_search_memory_phrases(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file(
+        "/memories/stack.txt",
+        "FastAPI framework for Python\nframework FastAPI\nthe quick brown fox jumps\nbrown fox jumps the quick\n",
+    )
+
+    assert tool.search_memory("fastapi framework") == {"/memories/stack.txt": [1, 2]}
+    assert tool.search_memory("FastAPI framework", phrase=True) == {"/memories/stack.txt": [1]}
+    assert tool.search_memory("framework fastapi", phrase=True) == {"/memories/stack.txt": [2]}
+    assert tool.search_memory("framework for python", phrase=True) == {"/memories/stack.txt": [1]}
+    # Longer phrases are narrowed by their triples and confirmed against the line text.
+    assert tool.search_memory("quick brown fox jumps", phrase=True) == {"/memories/stack.txt": [3]}
+    assert tool.search_memory("fox jumps the quick", phrase=True) == {"/memories/stack.txt": [4]}
+    assert tool.search_memory("python framework", phrase=True) == {}
+
+    tool.create_file("/memories/decoy.txt", "quick brown fox and brown fox jumps\n")
+    assert tool.search_memory("quick brown fox jumps", phrase=True) == {"/memories/stack.txt": [3]}
+
+
+def test_memorytool_create_files_validates_before_writing(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+
+    with pytest.raises(MemoryToolPathError):
+        tool.create_files([("/memories/ok.txt", "ok"), ("/elsewhere/bad.txt", "bad")])
+    assert not tool.memory_exists("/memories/ok.txt")
+
+    tool.create_files(
+        [
+            ("/memories/demo/profile.txt", "likes coffee"),
+            ("/memories/demo/projects.txt", "memorylake"),
+            ("/memories/notes.txt", "remember"),
+        ]
+    )
+    assert tool.list_memories() == [
+        "/memories/demo/",
+        "/memories/demo/profile.txt",
+        "/memories/demo/projects.txt",
+        "/memories/notes.txt",
+    ]
+    assert "   1: memorylake" in tool.view_path("/memories/demo/projects.txt")
+
+
+def test_memorytool_list_and_stats_walk_tree(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_files([("/memories/a/b.txt", "x"), ("/memories/a-b.txt", "yy"), ("/memories/a/.dot", "skip")])
+    (tmp_path / "memories" / "a" / "link").symlink_to(tmp_path / "memories" / "a-b.txt")
+
+    assert tool.list_memories() == ["/memories/a/", "/memories/a/b.txt", "/memories/a/link", "/memories/a-b.txt"]
+    assert tool.list_memories("/memories/a") == ["/memories/a/b.txt", "/memories/a/link"]
+    assert tool.stats() == {"files": 3, "directories": 1, "bytes": 5}
+
+
+def test_memorytool_rejects_directory_swapped_for_escaping_symlink(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path / "base")
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    tool.create_file("/memories/d/f.txt", "inside")
+
+    # Replace the directory behind the tool's back with a symlink that leaves the memory root.
+    shutil.rmtree(tmp_path / "base" / "memories" / "d")
+    (tmp_path / "base" / "memories" / "d").symlink_to(outside)
+
+    with pytest.raises(MemoryToolPathError, match="escapes memory root"):
+        tool.create_file("/memories/d/f.txt", "escaped")
+    assert not (outside / "f.txt").exists()
+
+
+def test_memorytool_apply_edits_reads_and_writes_once(
+    tmp_path: Any,
+    write_text_calls: list[tuple[Path, str]],
+) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/todo.txt", "alpha\nbeta\ngamma")
+    write_text_calls.clear()
+
+    tool.apply_edits(
+        "/memories/todo.txt",
+        [InsertLine(0, "header"), ReplaceText("beta", "BETA"), DeleteLine(2), InsertLine(3, "tail")],
+    )
+    assert [data for _, data in write_text_calls] == ["header\nBETA\ngamma\ntail\n"]
+
+    # Edits apply in sequence: after the first delete only three lines remain, and it is still written.
+    with pytest.raises(MemoryToolOperationError, match="between 1 and 3"):
+        tool.apply_edits("/memories/todo.txt", [DeleteLine(1), DeleteLine(4)])
+    assert (tmp_path / "memories" / "todo.txt").read_text(encoding="utf-8") == "BETA\ngamma\ntail\n"
+
+    with pytest.raises(MemoryToolOperationError, match="file not found"):
+        tool.apply_edits("/memories/missing.txt", [DeleteLine(1)])
+
+
+def test_memorytool_replace_text_misses_large_file_without_decoding(
+    tmp_path: Any,
+    monkeypatch: pytest.MonkeyPatch,
+    read_text_calls: list[Path],
+) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/big.txt", "needle in a haystack\n")
+    (tmp_path / "memories" / "crlf.txt").write_bytes(b"one\r\ntwo\r\n")
+    monkeypatch.setattr(MemoryTool, "_MMAP_REPLACE_THRESHOLD", 1)
+
+    with pytest.raises(MemoryToolOperationError, match="text not found"):
+        tool.replace_text("/memories/big.txt", "pin", "thread")
+    assert read_text_calls == []
+
+    tool.replace_text("/memories/big.txt", "needle", "pin")
+    assert "   1: pin in a haystack" in tool.view_path("/memories/big.txt")
+    # Newline-spanning text is matched on the decoded content, where "\r\n" reads as "\n".
+    tool.replace_text("/memories/crlf.txt", "one\ntwo", "both")
+    assert "   1: both" in tool.view_path("/memories/crlf.txt")
+
+
+def test_memorytool_line_edits_number_lines_like_view(tmp_path: Any) -> None:
+    tool = MemoryTool(base_path=tmp_path)
+    tool.create_file("/memories/ff.txt", "one\x0ctwo\nthree\n")
+    assert tool.view_path("/memories/ff.txt").splitlines()[1:] == ["   1: one", "   2: two", "   3: three"]
+
+    tool.insert_line("/memories/ff.txt", 3, "four")
+    tool.insert_line("/memories/ff.txt", 1, "one-and-a-half")
+    assert (tmp_path / "memories" / "ff.txt").read_text(encoding="utf-8") == "one\x0cone-and-a-half\ntwo\nthree\nfour\n"
+
+    tool.apply_edits("/memories/ff.txt", [DeleteLine(2), DeleteLine(4)])
+    assert tool.view_path("/memories/ff.txt").splitlines()[1:] == ["   1: one", "   2: two", "   3: three"]
+    with pytest.raises(MemoryToolOperationError, match="between 0 and 3"):
+        tool.insert_line("/memories/ff.txt", 4, "too far")
+
+
+@pytest.mark.parametrize("threshold", [1, 1 << 20])
+def test_memorytool_view_range_numbers_lines_like_full_view(
+    tmp_path: Any,
+    monkeypatch: pytest.MonkeyPatch,
+    threshold: int,
+) -> None:
+    monkeypatch.setattr(MemoryTool, "_MMAP_VIEW_THRESHOLD", threshold)
+    tool = MemoryTool(base_path=tmp_path)
+    (tmp_path / "memories" / "cr.txt").write_bytes(b"l1\rl2\rl3\r")
+    tool.create_file("/memories/ff.txt", "one\x0ctwo\nthree\nfour\n")
+
+    assert tool.view_path("/memories/cr.txt", view_range=(2, 3)).splitlines()[1:] == ["   2: l2", "   3: l3"]
+    assert tool.view_path("/memories/ff.txt", view_range=(1, 1)).splitlines()[1:] == ["   1: one"]
+    assert tool.view_path("/memories/ff.txt", view_range=(2, 2)).splitlines()[1:] == ["   2: two"]
+    assert tool.view_path("/memories/ff.txt", view_range=(3, -1)).splitlines()[1:] == ["   3: three", "   4: four"]
+
+    # "\r\n" is one break; a lone "\r" past the window cannot shift it, one inside it splits the line.
+    (tmp_path / "memories" / "crlf.txt").write_bytes(b"a\r\nb\r\nc\rd\r\n")
+    assert tool.view_path("/memories/crlf.txt", view_range=(2, 2)).splitlines()[1:] == ["   2: b"]
+    assert tool.view_path("/memories/crlf.txt", view_range=(3, 4)).splitlines()[1:] == ["   3: c", "   4: d"]
@@ -1,3 +1,4 @@
+import subprocess
 import sys
 from pathlib import Path
 from typing import Any
@@ -26,3 +27,15 @@ def test_version_number_match() -> None:
 
     # Check that the versions match
     assert memorylake.__version__ == pyproject_version
+
+
+def test_version_import_does_not_load_anthropic() -> None:
+    code = (
+        "import sys, memorylake; "
+        "assert memorylake.__version__; "
+        "assert 'anthropic' not in sys.modules and 'memorylake.memorytool' not in sys.modules; "
+        "from memorylake import MemoryTool; "
+        "assert MemoryTool is sys.modules['memorylake.memorytool'].MemoryTool"
+    )
+    project_root: Path = Path(__file__).parent.parent.parent
+    subprocess.run([sys.executable, "-c", code], cwd=project_root, check=True)